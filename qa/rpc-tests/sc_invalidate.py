@@ -7,16 +7,22 @@ from test_framework.test_framework import BitcoinTestFramework
 from test_framework.test_framework import MINIMAL_SC_HEIGHT, MINER_REWARD_POST_H200
 from test_framework.authproxy import JSONRPCException
 from test_framework.util import assert_true, assert_equal, initialize_chain_clean, \
-    start_nodes, sync_blocks, sync_mempools, connect_nodes_bi, \
-    dump_ordered_tips, mark_logs, disconnect_nodes
+    start_nodes, connect_nodes_bi, \
+    dump_ordered_tips, mark_logs
 from test_framework.mc_test.mc_test import *
 import os
 from decimal import Decimal
+from threading import Thread
 import time
 
 NUMB_OF_NODES = 3
 DEBUG_MODE = 1
 SC_FEE = Decimal("0.00001")
+JOIN_TIMEOUT = 60
+
+if DEBUG_MODE == 0:
+    # logging helpers are no-ops anyway, avoid paying for the calls
+    mark_logs = dump_ordered_tips = lambda *args, **kwargs: None
 
 
 class ScInvalidateTest(BitcoinTestFramework):
@@ -29,7 +35,7 @@ class ScInvalidateTest(BitcoinTestFramework):
         with open(self.alert_filename, 'w'):
             pass  # Just open then close to create zero-length file
 
-    def setup_network(self, split=False):
+    def setup_network(self):
         self.nodes = []
 
         self.nodes = start_nodes(NUMB_OF_NODES, self.options.tmpdir,
@@ -37,30 +43,30 @@ class ScInvalidateTest(BitcoinTestFramework):
                                               '-debug=py', '-debug=mempool', '-debug=net',
                                               '-debug=bench']] * NUMB_OF_NODES)
 
-        if not split:
-            # 1 and 2 are joint only if split==false
-            connect_nodes_bi(self.nodes, 1, 2)
-            sync_blocks(self.nodes[1:NUMB_OF_NODES])
-            sync_mempools(self.nodes[1:NUMB_OF_NODES])
-
+        connect_nodes_bi(self.nodes, 1, 2)
         connect_nodes_bi(self.nodes, 0, 1)
-        self.is_network_split = split
+        self.is_network_split = False
         self.sync_all()
 
     def split_network(self):
-        # Split the network of three nodes into nodes 0-1 and 2.
-        assert not self.is_network_split
-        disconnect_nodes(self.nodes[1], 2)
-        disconnect_nodes(self.nodes[2], 1)
+        # Split the network of three nodes into nodes 0-1 and 2, nothing to do if already split.
+        if self.is_network_split:
+            return
+        self.disconnect_nodes(1, 2)
+        self.disconnect_nodes(2, 1)
         self.is_network_split = True
 
     def join_network(self):
-        # Join the (previously split) network pieces together: 0-1-2
-        assert self.is_network_split
+        # Join the (previously split) network pieces together: 0-1-2, nothing to do if already joined.
+        if not self.is_network_split:
+            return
         connect_nodes_bi(self.nodes, 1, 2)
-        connect_nodes_bi(self.nodes, 2, 1)
-        # self.sync_all()
-        time.sleep(2)
+        # wait for the reorg to be completed on every node
+        deadline = time.time() + JOIN_TIMEOUT
+        while len(set(node.getbestblockhash() for node in self.nodes)) > 1:
+            if time.time() > deadline:
+                raise AssertionError("Nodes did not reach the same best block within {}s".format(JOIN_TIMEOUT))
+            time.sleep(0.1)
         self.is_network_split = False
 
     def run_test(self):
@@ -70,28 +76,32 @@ class ScInvalidateTest(BitcoinTestFramework):
         '''
         # network topology: (0)--(1)--(2)
 
-        blocks = [self.nodes[0].getblockhash(0)]
-
         fwt_amount_1 = Decimal("1.0")
 
-        # node 1 earns some coins, they would be available after 100 blocks
-        mark_logs("Node 1 generates 1 block", self.nodes, DEBUG_MODE)
+        # generate wCertVk and wCeasedVk in the background: mcTest runs as a separate process and
+        # does not depend on the chain, so it can overlap with the block generation below
+        vks = {}
 
-        blocks.extend(self.nodes[1].generate(1))
-        self.sync_all()
+        def generate_vks():
+            try:
+                vks['cert'] = CertTestUtils(self.options.tmpdir, self.options.srcdir, "darlin").generate_params("sc1")
+                vks['csw'] = CSWTestUtils(self.options.tmpdir, self.options.srcdir).generate_params("sc1")
+            except Exception as e:
+                # re-raised by the main thread after join
+                vks['error'] = e
+                raise
 
-        # node 2 earns some coins, they would be available after 100 blocks
-        mark_logs("Node 2 generates 1 block", self.nodes, DEBUG_MODE)
+        vk_thread = Thread(target=generate_vks)
+        vk_thread.daemon = True
+        vk_thread.start()
 
-        blocks.extend(self.nodes[2].generate(1))
-        self.sync_all()
-
-        mark_logs("Node 0 generates {} block".format(MINIMAL_SC_HEIGHT), self.nodes, DEBUG_MODE)
+        # node 1 earns the coins it needs, its first coinbases are mature well before the end of this
+        # step; the other nodes never spend coins of their own, so a single generate/sync pass is enough
+        mark_logs("Node 1 generates {} block".format(MINIMAL_SC_HEIGHT + 2), self.nodes, DEBUG_MODE)
 
-        blocks.extend(self.nodes[0].generate(MINIMAL_SC_HEIGHT))
+        self.nodes[1].generate(MINIMAL_SC_HEIGHT + 2)
         self.sync_all()
 
-
         tx_amount = Decimal('10.00000000')
         # ---------------------------------------------------------------------------------------
         # Node 1 sends 10 coins to node 2 to have UTXO
@@ -102,30 +112,26 @@ class ScInvalidateTest(BitcoinTestFramework):
 
         self.sync_all()
 
-        blocks.extend(self.nodes[0].generate(2))
-        prev_epoch_block_hash = blocks[-1]
+        self.nodes[0].generate(2)
 
         self.sync_all()
 
         # Node 2 create rawtransaction that creates a SC using last UTXO
         mark_logs("\nNode 2 create rawtransaction that creates a SC using last UTXO...", self.nodes, DEBUG_MODE)
 
-        decodedTx = self.nodes[2].decoderawtransaction(self.nodes[2].gettransaction(txid)['hex'])
-        vout = {}
-        for outpoint in decodedTx['vout']:
-            if outpoint['value'] == tx_amount:
-                vout = outpoint
-                break
+        decodedTx = self.nodes[2].getrawtransaction(txid, 1)
+        vout = next(o for o in decodedTx['vout'] if o['value'] == tx_amount)
 
         sc_address = "0000000000000000000000000000000000000000000000000000000000000abc"
         sc_epoch = 123
         sc_cr_amount = tx_amount
 
-        #generate wCertVk and constant
-        mcTest = CertTestUtils(self.options.tmpdir, self.options.srcdir, "darlin")
-        certVk = mcTest.generate_params("sc1")
-        mcTest = CSWTestUtils(self.options.tmpdir, self.options.srcdir)
-        cswVk = mcTest.generate_params("sc1")
+        # wait for wCertVk and wCeasedVk, generate constant
+        vk_thread.join()
+        if 'error' in vks:
+            raise vks['error']
+        certVk = vks['cert']
+        cswVk = vks['csw']
         constant = generate_random_field_element_hex()
 
         sc = [{
@@ -147,7 +153,8 @@ class ScInvalidateTest(BitcoinTestFramework):
         # Node 2 create rawtransaction with same UTXO
         mark_logs("\nNode 2 create rawtransaction with same UTXO...", self.nodes, DEBUG_MODE)
 
-        outputs = {self.nodes[0].getnewaddress(): sc_cr_amount}
+        addr0 = self.nodes[0].getnewaddress()
+        outputs = {addr0: sc_cr_amount}
         rawtx2 = self.nodes[2].createrawtransaction(inputs, outputs)
         sigRawtx2 = self.nodes[2].signrawtransaction(rawtx2)
 
@@ -178,13 +185,12 @@ class ScInvalidateTest(BitcoinTestFramework):
         try:
             mbtrTx = self.nodes[1].sc_request_transfer(outputs, cmdParms)
             mark_logs("  --> mbtrTx = {}.".format(mbtrTx), self.nodes, DEBUG_MODE)
-        except JSONRPCException, e:
+        except JSONRPCException as e:
             errorString = e.error['message']
             mark_logs(errorString,self.nodes,DEBUG_MODE)
             assert_true(False)
 
         totScFee = totScFee + SC_FEE
-        self.sync_all()
 
         # Node 1 creates a FT of 1.0 coin and Node 0 generates 1 block
         mark_logs("\nNode1 sends " + str(fwt_amount_1) + " coins to SC", self.nodes, DEBUG_MODE)
@@ -193,25 +199,26 @@ class ScInvalidateTest(BitcoinTestFramework):
         ftTx = self.nodes[1].sc_send(cmdInput, {"minconf": 0})
         self.sync_all()
 
-        assert_true(crTx in self.nodes[0].getrawmempool())
-        assert_true(mbtrTx in self.nodes[0].getrawmempool())
-        assert_true(ftTx in self.nodes[0].getrawmempool())
+        mempool = self.nodes[0].getrawmempool()
+        assert_true(crTx in mempool)
+        assert_true(mbtrTx in mempool)
+        assert_true(ftTx in mempool)
 
         mark_logs("\n...Node0 generating 1 block", self.nodes, DEBUG_MODE)
-        blocks.extend(self.nodes[0].generate(1))
+        self.nodes[0].generate(1)
         self.sync_all()
 
         mark_logs("\nChecking SC info on Node 2 that should not have any SC...", self.nodes, DEBUG_MODE)
         scinfoNode0 = self.nodes[0].getscinfo(scid)['items'][0]
         scinfoNode1 = self.nodes[1].getscinfo(scid)['items'][0]
-        mark_logs("Node 0: " + str(scinfoNode0), self.nodes, DEBUG_MODE)
-        mark_logs("Node 1: " + str(scinfoNode1), self.nodes, DEBUG_MODE)
+        if DEBUG_MODE:
+            mark_logs("Node 0: " + str(scinfoNode0), self.nodes, DEBUG_MODE)
+            mark_logs("Node 1: " + str(scinfoNode1), self.nodes, DEBUG_MODE)
         assert_equal(0, self.nodes[2].getscinfo(scid)['totalItems'])
 
         # Node 2 generate 4 blocks including the rawtx2 and now it has the longest fork
         mark_logs("\nNode 2 generate 4 blocks including the rawtx2 and now it has the longest fork...", self.nodes, DEBUG_MODE)
         finalTx2 = self.nodes[2].sendrawtransaction(sigRawtx2['hex'])
-        self.sync_all()
 
         self.nodes[2].generate(4)
         self.sync_all()
@@ -220,22 +227,18 @@ class ScInvalidateTest(BitcoinTestFramework):
         self.join_network()
         mark_logs("\nNetwork joined", self.nodes, DEBUG_MODE)
 
-        # Checking the network chain tips
-        mark_logs("\nChecking network chain tips, Node 2's fork became active...", self.nodes, DEBUG_MODE)
-        for i in range(0, NUMB_OF_NODES):
-            chaintips = self.nodes[i].getchaintips()
-            dump_ordered_tips(chaintips, DEBUG_MODE)
-
-        # Checking SC info on network
-        mark_logs("\nChecking SC info on network, none see the SC...", self.nodes, DEBUG_MODE)
-        for i in range(0, NUMB_OF_NODES):
-            assert_equal(0, self.nodes[i].getscinfo(scid)['totalItems'])
-
-        # The transactions should not be in mempool
-        mark_logs("\nThe FT and MBTR transactions should not be in mempool anymore...", self.nodes, DEBUG_MODE)
-        for i in range(0, NUMB_OF_NODES):
-            txmem = self.nodes[i].getrawmempool()
-            assert_equal(len(txmem), 0)
+        # Checking the network state with a single batched request per node
+        mark_logs("\nChecking network chain tips, Node 2's fork became active, none see the SC and "
+                  "the FT and MBTR transactions are not in mempool anymore...", self.nodes, DEBUG_MODE)
+        for node in self.nodes:
+            chaintips, scinfo, txmem = node.batch([node.getchaintips.get_request(),
+                                                   node.getscinfo.get_request(scid),
+                                                   node.getrawmempool.get_request()])
+            for reply in (chaintips, scinfo, txmem):
+                assert_equal(None, reply['error'])
+            dump_ordered_tips(chaintips['result'], DEBUG_MODE)
+            assert_equal(0, scinfo['result']['totalItems'])
+            assert_equal(len(txmem['result']), 0)
 
 
 if __name__ == '__main__':
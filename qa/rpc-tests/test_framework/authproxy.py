@@ -140,15 +140,18 @@ class AuthServiceProxy(object):
             else:
                 raise
 
-    def __call__(self, *args):
+    def get_request(self, *args):
         AuthServiceProxy.__id_count += 1
 
         log.debug("-%s-> %s %s"%(AuthServiceProxy.__id_count, self.__service_name,
                                  json.dumps(args, default=EncodeDecimal)))
-        postdata = json.dumps({'version': '1.1',
-                               'method': self.__service_name,
-                               'params': args,
-                               'id': AuthServiceProxy.__id_count}, default=EncodeDecimal)
+        return {'version': '1.1',
+                'method': self.__service_name,
+                'params': args,
+                'id': AuthServiceProxy.__id_count}
+
+    def __call__(self, *args):
+        postdata = json.dumps(self.get_request(*args), default=EncodeDecimal)
 
         if 'ws_' in self.__service_name:
             # this is a websocket msg, handle it via ws proxy
@@ -168,6 +171,20 @@ class AuthServiceProxy(object):
         log.debug("--> "+postdata)
         return self._request('POST', self.__url.path, postdata)
 
+    def batch(self, rpc_call_list):
+        '''
+        Send the requests built with get_request(), e.g. node.getblockcount.get_request(), in a
+        single JSON-RPC batch and return the replies in the same order as the requests.
+        Each reply is a dict with 'result' and 'error' keys.
+        '''
+        rpc_call_list = list(rpc_call_list)
+        response = self._batch(rpc_call_list)
+        if not isinstance(response, list):
+            raise JSONRPCException(response.get('error') or {
+                'code': -344, 'message': 'unexpected JSON-RPC batch response'})
+        replies = dict((reply['id'], reply) for reply in response)
+        return [replies[call['id']] for call in rpc_call_list]
+
     def _get_response(self):
         http_response = self.__conn.getresponse()
         if http_response is None:
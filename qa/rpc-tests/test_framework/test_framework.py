@@ -17,7 +17,7 @@ from authproxy import JSONRPCException
 from wsproxy import JSONWSException
 from util import assert_equal, check_json_precision, \
     initialize_chain, initialize_chain_clean, \
-    start_nodes, connect_nodes_bi, stop_nodes, \
+    start_nodes, connect_nodes_bi, disconnect_nodes, stop_nodes, \
     sync_blocks, sync_mempools, wait_bitcoinds
 
 MINIMAL_SC_HEIGHT = 420
@@ -70,6 +70,13 @@ class BitcoinTestFramework(object):
         wait_bitcoinds()
         self.setup_network(True)
 
+    def disconnect_nodes(self, from_node, to_node):
+        """
+        Disconnect node from_node from node to_node, both given as indexes into self.nodes.
+        Unlike split_network() this does not restart any node.
+        """
+        disconnect_nodes(self.nodes[from_node], to_node)
+
     def sync_all(self):
         if self.is_network_split:
             sync_blocks(self.nodes[:2])
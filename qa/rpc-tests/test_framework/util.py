@@ -14,6 +14,7 @@ import sys
 from binascii import hexlify, unhexlify
 from base64 import b64encode
 from decimal import Decimal, ROUND_DOWN
+from operator import itemgetter
 import codecs
 import json
 import random
@@ -492,14 +493,16 @@ def disconnect_nodes(from_connection, node_num):
     ip_port = "127.0.0.1:" + str(p2p_port(node_num))
     from_connection.disconnectnode(ip_port)
     # poll until version handshake complete to avoid race conditions
-    # with transaction relaying
+    # with transaction relaying, backing off from 5ms up to 100ms
+    delay = 0.005
     while any(peer['version'] == 0 for peer in from_connection.getpeerinfo()):
-        time.sleep(0.1)
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
 
 def dump_ordered_tips(tip_list,debug=0):
     if debug == 0:
         return
-    sorted_x = sorted(tip_list, key=lambda k: k['status'])
+    sorted_x = sorted(tip_list, key=itemgetter('status'))
     c = 0
     for y in sorted_x:
         if (c == 0):